@@ -1,11 +1,16 @@
-from asyncio import run, sleep
-from copy import deepcopy
+from asyncio import gather, run
 from datetime import datetime
 
 from logger import logger
-from misc import Candle, DiscordMessage, Liquidation, LiquidationSet
+from misc import (
+    DiscordMessage,
+    Liquidation,
+    LiquidationSet,
+    next_minute,
+    sleep_until,
+)
 import threading
-from typing import List
+from typing import Deque
 
 from coinalyze_scanner import CoinalyzeScanner, COINALYZE_LIQUIDATION_URL
 from discord_client import USE_DISCORD, get_discord_table
@@ -34,9 +39,11 @@ if USE_DISCORD:
         minimal_nr_of_liquidations=MINIMAL_NR_OF_LIQUIDATIONS,
         minimal_liquidation=MINIMAL_LIQUIDATION,
         interval=INTERVAL,
-        liquidation_days=LIQUIDATION_DAYS,
-        liquidation_hours=LIQUIDATION_HOURS,
-        forbidden_nr_of_candles_before_entry=FORBIDDEN_NR_OF_CANDLES_BEFORE_ENTRY,
+        liquidation_days=sorted(LIQUIDATION_DAYS),
+        liquidation_hours=sorted(LIQUIDATION_HOURS),
+        forbidden_nr_of_candles_before_entry=sorted(
+            FORBIDDEN_NR_OF_CANDLES_BEFORE_ENTRY
+        ),
     )
 
     if USE_FIXED_RISK:
@@ -49,8 +56,8 @@ if USE_DISCORD:
         DISCORD_SETTINGS["position_percentage"] = POSITION_PERCENTAGE
 
 
-LIQUIDATIONS: List[Liquidation] = []
-LIQUIDATION_SET: LiquidationSet = LiquidationSet(liquidations=LIQUIDATIONS)
+LIQUIDATION_SET: LiquidationSet = LiquidationSet()
+LIQUIDATIONS: Deque[Liquidation] = LIQUIDATION_SET.liquidations
 
 
 async def main() -> None:
@@ -88,10 +95,10 @@ async def main() -> None:
             )
         )
 
+    now = datetime.now()
     while True:
-        now = datetime.now()
 
-        if (now.minute % 5 == 0 and now.second == 0) or first_run:
+        if now.minute % 5 == 0 or first_run:
 
             # disable first_run if needed
             if first_run:
@@ -99,39 +106,35 @@ async def main() -> None:
 
             # update scanner time
             scanner.now = now
-            last_candle: Candle | None = await exchange.get_last_candle(now)
+
+            # fetch the last candle and the fresh liquidations concurrently
+            last_candle, symbols = await gather(
+                exchange.get_last_candle(now),
+                scanner.handle_coinalyze_url(COINALYZE_LIQUIDATION_URL),
+            )
             if last_candle:
 
                 # run strategy for the exchange on LIQUIDATIONS list
                 await exchange.run_loop(last_candle)
 
                 # check for fresh liquidations and add to LIQUIDATIONS list
-                await scanner.handle_liquidation_set(
-                    last_candle,
-                    await scanner.handle_coinalyze_url(COINALYZE_LIQUIDATION_URL),
-                )
+                scanner.handle_liquidation_set(last_candle, symbols)
 
                 # log liquidations if any
                 if LIQUIDATIONS:
-                    logger.info(f"{LIQUIDATIONS=}")
+                    logger.info("LIQUIDATIONS=%r", LIQUIDATIONS)
 
-            await sleep(0.99)
-
-        if now.minute % 5 == 3 and now.second == 0:
+        if now.minute % 5 == 3:
 
             # fetch open positions and orders from the exchange
             await exchange.get_open_positions()
 
-            await sleep(0.99)
-
-        if now.minute % 5 == 4 and now.second == 0:
+        if now.minute % 5 == 4:
 
             # recalculate position sizes based on current balance
             await exchange.set_position_sizes()
 
-            await sleep(0.99)
-
-        if USE_DISCORD and (now.hour % 12 == 8 and now.minute == 1 and now.second == 0):
+        if USE_DISCORD and (now.hour % 12 == 8 and now.minute == 1):
 
             # send heartbeat message to discord
             exchange.discord_message_queue.append(
@@ -141,21 +144,20 @@ async def main() -> None:
             # update symbols in scanner
             await scanner.set_symbols()
 
-            await sleep(0.99)
-
         if USE_DISCORD and exchange.discord_message_queue:
 
-            # post messages to discord from the queue
-            message_queue = deepcopy(exchange.discord_message_queue)
-            exchange.discord_message_queue.clear()
+            # hand the queued messages to the posting thread and start a new
+            # queue, the messages themselves are never mutated after queueing
+            message_queue = exchange.discord_message_queue
+            exchange.discord_message_queue = []
             threading.Thread(
                 target=post_to_discord,
                 kwargs=dict(message_queue=message_queue),
             ).start()
 
-            await sleep(0.99)
-
-        await sleep(0.01)
+        # sleep until the start of the next minute instead of polling the clock
+        now = next_minute(datetime.now())
+        await sleep_until(now)
 
 
 if __name__ == "__main__":
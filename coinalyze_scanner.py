@@ -1,6 +1,10 @@
+import aiohttp
 from datetime import datetime, timedelta
+from time import time
 from decouple import config, Csv
 from functools import cached_property
+import numpy as np
+import orjson
 
 from discord_client import USE_DISCORD
 
@@ -11,8 +15,13 @@ if USE_DISCORD:
         DISCORD_CHANNEL_HEARTBEAT_ID,
     )
 from logger import logger
-from misc import Candle, DiscordMessage, Liquidation, LiquidationSet
-import requests
+from misc import (
+    Candle,
+    DiscordMessage,
+    Liquidation,
+    LiquidationSet,
+    datetime_from_ms,
+)
 from typing import List
 
 
@@ -21,23 +30,83 @@ COINALYZE_LIQUIDATION_URL = "https://api.coinalyze.net/v1/liquidation-history"
 FUTURE_MARKETS_URL = "https://api.coinalyze.net/v1/future-markets"
 
 MINIMAL_NR_OF_LIQUIDATIONS = config("MINIMAL_NR_OF_LIQUIDATIONS", default="1", cast=int)
-logger.info(f"{MINIMAL_NR_OF_LIQUIDATIONS=}")
+logger.info("MINIMAL_NR_OF_LIQUIDATIONS=%r", MINIMAL_NR_OF_LIQUIDATIONS)
 MINIMAL_LIQUIDATION = config("MINIMAL_LIQUIDATION", default="2000", cast=int)
-logger.info(f"{MINIMAL_LIQUIDATION=}")
+logger.info("MINIMAL_LIQUIDATION=%r", MINIMAL_LIQUIDATION)
 N_MINUTES_TIMEDELTA = config("N_MINUTES_TIMEDELTA", default="5", cast=int)
-logger.info(f"{N_MINUTES_TIMEDELTA=}")
+logger.info("N_MINUTES_TIMEDELTA=%r", N_MINUTES_TIMEDELTA)
 INTERVAL = config("INTERVAL", default="5min")
-logger.info(f"{INTERVAL=}")
+logger.info("INTERVAL=%r", INTERVAL)
 LIQUIDATION_DAYS = config(
-    "LIQUIDATION_DAYS", cast=Csv(int), default="0,1,2,3,4"
+    "LIQUIDATION_DAYS", cast=Csv(int, post_process=frozenset), default="0,1,2,3,4"
 )  # Monday to Friday
-logger.info(f"{LIQUIDATION_DAYS=}")
+logger.info("LIQUIDATION_DAYS=%r", LIQUIDATION_DAYS)
 LIQUIDATION_HOURS = config(
     "LIQUIDATION_HOURS",
-    cast=Csv(int),
+    cast=Csv(int, post_process=frozenset),
     default="2,3,4,14,15,16",
 )
-logger.info(f"{LIQUIDATION_HOURS=}")
+logger.info("LIQUIDATION_HOURS=%r", LIQUIDATION_HOURS)
+SYMBOLS_CACHE_FILE = config("SYMBOLS_CACHE_FILE", default="symbols_cache.txt")
+SYMBOLS_CACHE_TTL_HOURS = config("SYMBOLS_CACHE_TTL_HOURS", default="24", cast=int)
+REFRESH_SYMBOLS = config("REFRESH_SYMBOLS", default=False, cast=bool)
+
+# Shared pooled HTTP session for all Coinalyze requests, created on first use so
+# it is bound to the running event loop
+_HTTP_SESSION: aiohttp.ClientSession | None = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Returns the shared HTTP session for the requests to the API"""
+    global _HTTP_SESSION
+    if _HTTP_SESSION is None or _HTTP_SESSION.closed:
+        _HTTP_SESSION = aiohttp.ClientSession(
+            headers={"api_key": COINALYZE_SECRET_API_KEY},
+            connector=aiohttp.TCPConnector(limit=16, keepalive_timeout=75),
+            timeout=aiohttp.ClientTimeout(total=60),
+        )
+    return _HTTP_SESSION
+
+
+def aggregate_liquidations(symbols: List[dict]) -> tuple[float, float, int]:
+    """Sum the long and short liquidations of all symbols and count the symbols
+    with a liquidation above 100 per direction
+
+    Args:
+        symbols (List[dict]): latest history entry per symbol
+    """
+
+    count = len(symbols)
+    longs = np.fromiter((entry.get("l", 0) for entry in symbols), np.float64, count)
+    shorts = np.fromiter((entry.get("s", 0) for entry in symbols), np.float64, count)
+    nr_of_liquidations = int(
+        np.count_nonzero(longs > 100) + np.count_nonzero(shorts > 100)
+    )
+    return float(longs.sum()), float(shorts.sum()), nr_of_liquidations
+
+
+def read_symbols_cache() -> str | None:
+    """Read the symbols cached on disk, None if missing or older than the TTL"""
+
+    try:
+        with open(SYMBOLS_CACHE_FILE) as file:
+            cached_at, symbols = file.read().splitlines()[:2]
+        cached_at = float(cached_at)
+    except (OSError, ValueError):
+        return None
+    if time() - cached_at > SYMBOLS_CACHE_TTL_HOURS * 3600 or not symbols:
+        return None
+    return symbols
+
+
+def write_symbols_cache(symbols: str) -> None:
+    """Write the symbols to disk with the current timestamp as header"""
+
+    try:
+        with open(SYMBOLS_CACHE_FILE, "w") as file:
+            file.write(f"{time()}\n{symbols}\n")
+    except OSError as e:
+        logger.error("Error writing symbols cache: %s", e)
 
 
 class CoinalyzeScanner:
@@ -48,19 +117,43 @@ class CoinalyzeScanner:
         self.now = now
         self.liquidation_set = liquidation_set
         self.exchange = None
+        self._params_key: tuple | None = None
+        self._params: dict = {}
+
+    async def close(self) -> None:
+        """Close the shared HTTP session used for the requests to the API"""
+        if _HTTP_SESSION is not None and not _HTTP_SESSION.closed:
+            await _HTTP_SESSION.close()
+
+    @property
+    def now(self) -> datetime:
+        """Returns the time of the current tick"""
+        return self._now
+
+    @now.setter
+    def now(self, now: datetime) -> None:
+        """Sets the time of the current tick and its value floored to the minute"""
+        self._now = now
+        self.now_floor: datetime = now.replace(second=0, microsecond=0)
 
     @property
     def params(self) -> dict:
-        """Returns the parameters for the request to the API"""
-        rounded_now: datetime = self.now.replace(second=0, microsecond=0)
-        return {
-            "symbols": self.symbols,
-            "from": int(
-                datetime.timestamp(rounded_now - timedelta(minutes=N_MINUTES_TIMEDELTA))
-            ),
-            "to": int(datetime.timestamp(rounded_now)),
-            "interval": INTERVAL,
-        }
+        """Returns the parameters for the request to the API, computed once per tick"""
+        params_key = (self.now_floor, self.symbols)
+        if self._params_key != params_key:
+            rounded_now: datetime = self.now_floor
+            self._params = {
+                "symbols": self.symbols,
+                "from": int(
+                    datetime.timestamp(
+                        rounded_now - timedelta(minutes=N_MINUTES_TIMEDELTA)
+                    )
+                ),
+                "to": int(datetime.timestamp(rounded_now)),
+                "interval": INTERVAL,
+            }
+            self._params_key = params_key
+        return self._params
 
     @cached_property
     def symbols(self) -> str:
@@ -72,92 +165,69 @@ class CoinalyzeScanner:
         symbols = []
         if hasattr(self, "_symbols"):
             symbols = self._symbols.split(",")
-        for market in await self.handle_coinalyze_url(
+        elif not REFRESH_SYMBOLS and (cached_symbols := read_symbols_cache()):
+            # on startup reuse the symbols of a recent run
+            self._symbols = cached_symbols
+            return
+        markets = await self.handle_coinalyze_url(
             url=FUTURE_MARKETS_URL, include_params=False, symbols=True
-        ):
+        )
+        for market in markets:
             if (symbol := market.get("symbol", "").upper()).startswith("BTCUSD"):
                 symbols.append(symbol)
         self._symbols = ",".join(list(set(symbols)))
+        if markets:
+            write_symbols_cache(self._symbols)
 
-    async def handle_liquidation_set(self, candle: Candle, symbols: list) -> None:
-        """Handle the liquidation set and check for liquidations
+    def detect_liquidations(self, candle: Candle, symbols: list) -> List[Liquidation]:
+        """Aggregate the history of all symbols once and return the long and short
+        liquidations above the thresholds
 
         Args:
-            history (dict): history of the liquidation
+            candle (Candle): last closed candle
+            symbols (list): latest history entry per symbol
         """
 
-        total_long, total_short = 0, 0
         l_time = symbols[0].get("t") if len(symbols) else 0
-        nr_of_liquidations = 0
-        for history in symbols:
-            long = history.get("l")
-            total_long += long
-            if long > 100:
-                nr_of_liquidations += 1
-            short = history.get("s")
-            total_short += short
-            if short > 100:
-                nr_of_liquidations += 1
-
-        discord_liquidations: List[Liquidation] = []
-        if (
-            total_long > MINIMAL_LIQUIDATION
-            and nr_of_liquidations >= MINIMAL_NR_OF_LIQUIDATIONS
-        ):
-            long_liquidation = Liquidation(
-                _id=str(
-                    "l-"
-                    + datetime.fromtimestamp(candle.timestamp / 1000).strftime("%H%M")
-                ),
-                amount=total_long,
-                direction="long",
+        total_long, total_short, nr_of_liquidations = aggregate_liquidations(symbols)
+        if nr_of_liquidations < MINIMAL_NR_OF_LIQUIDATIONS:
+            return []
+
+        # the candle time is shared by the long and short liquidation
+        candle_datetime = datetime_from_ms(candle.timestamp)
+        candle_hhmm = candle_datetime.strftime("%H%M")
+        on_liquidation_days = candle_datetime.weekday() in LIQUIDATION_DAYS
+        during_liquidation_hours = candle_datetime.hour in LIQUIDATION_HOURS
+
+        return [
+            Liquidation(
+                _id=prefix + candle_hhmm,
+                amount=total,
+                direction=direction,
                 time=l_time,
                 nr_of_liquidations=nr_of_liquidations,
                 candle=candle,
-                on_liquidation_days=(
-                    datetime.fromtimestamp(candle.timestamp / 1000).weekday()
-                    in LIQUIDATION_DAYS
-                ),
-                during_liquidation_hours=(
-                    datetime.fromtimestamp(candle.timestamp / 1000).hour
-                    in LIQUIDATION_HOURS
-                ),
+                on_liquidation_days=on_liquidation_days,
+                during_liquidation_hours=during_liquidation_hours,
             )
-            if (
-                long_liquidation.on_liquidation_days
-                and long_liquidation.during_liquidation_hours
-            ):
-                self.liquidation_set.liquidations.insert(0, long_liquidation)
-            discord_liquidations.append(long_liquidation)
-        if (
-            total_short > MINIMAL_LIQUIDATION
-            and nr_of_liquidations >= MINIMAL_NR_OF_LIQUIDATIONS
-        ):
-            short_liquidation = Liquidation(
-                _id=str(
-                    "s-"
-                    + datetime.fromtimestamp(candle.timestamp / 1000).strftime("%H%M")
-                ),
-                amount=total_short,
-                direction="short",
-                time=l_time,
-                nr_of_liquidations=nr_of_liquidations,
-                candle=candle,
-                on_liquidation_days=(
-                    datetime.fromtimestamp(candle.timestamp / 1000).weekday()
-                    in LIQUIDATION_DAYS
-                ),
-                during_liquidation_hours=(
-                    datetime.fromtimestamp(candle.timestamp / 1000).hour
-                    in LIQUIDATION_HOURS
-                ),
+            for direction, prefix, total in (
+                ("long", "l-", total_long),
+                ("short", "s-", total_short),
             )
-            if (
-                short_liquidation.on_liquidation_days
-                and short_liquidation.during_liquidation_hours
-            ):
-                self.liquidation_set.liquidations.insert(0, short_liquidation)
-            discord_liquidations.append(short_liquidation)
+            if total > MINIMAL_LIQUIDATION
+        ]
+
+    def handle_liquidation_set(self, candle: Candle, symbols: list) -> None:
+        """Handle the liquidation set and check for liquidations
+
+        Args:
+            history (dict): history of the liquidation
+        """
+
+        discord_liquidations = self.detect_liquidations(candle, symbols)
+        for liquidation in discord_liquidations:
+            if liquidation.on_liquidation_days and liquidation.during_liquidation_hours:
+                self.liquidation_set.liquidations.appendleft(liquidation)
         if USE_DISCORD and discord_liquidations:
             self.exchange.discord_message_queue.append(
                 DiscordMessage(
@@ -178,13 +248,11 @@ class CoinalyzeScanner:
             url (str): url to check for liquidations
         """
         try:
-            response = requests.get(
-                url,
-                headers={"api_key": COINALYZE_SECRET_API_KEY},
-                params=self.params if include_params else {},
-            )
-            response.raise_for_status()
-            response_json = response.json()
+            async with get_http_session().get(
+                url, params=self.params if include_params else None
+            ) as response:
+                response.raise_for_status()
+                response_json = orjson.loads(await response.read())
         except Exception as e:
             logger.error(str(e))
             if USE_DISCORD:
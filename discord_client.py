@@ -8,7 +8,7 @@ from misc import DiscordMessage
 
 
 USE_DISCORD = config("USE_DISCORD", cast=bool, default=False)
-logger.info(f"{USE_DISCORD=}")
+logger.info("USE_DISCORD=%r", USE_DISCORD)
 if USE_DISCORD:
     DISCORD_CHANNEL_POSITIONS_ID = config("DISCORD_CHANNEL_POSITIONS_ID", cast=int)
     DISCORD_CHANNEL_HEARTBEAT_ID = config("DISCORD_CHANNEL_HEARTBEAT_ID", cast=int)
@@ -61,11 +61,11 @@ def post_to_discord(message_queue: List[DiscordMessage]) -> None:
                 for message in discord_message.messages:
                     await channel.send(f"{message}")
         except Exception as e:
-            logger.error(f"Failed to post to Discord: {e}")
+            logger.error("Failed to post to Discord: %s", e)
         finally:
             await client.close()
 
     try:
         client.run(token=DISCORD_PRIVATE_KEY, log_handler=None)
     except Exception as e:
-        logger.error(f"Failed to post to Discord: {e}")
+        logger.error("Failed to post to Discord: %s", e)
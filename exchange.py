@@ -1,10 +1,11 @@
-from asyncio import sleep
-from copy import deepcopy
+from asyncio import gather, sleep, to_thread
+import csv
 import os
 import ccxt.pro as ccxt
 from coinalyze_scanner import CoinalyzeScanner
 from datetime import datetime, timedelta, date
 from decouple import config, Csv
+from functools import lru_cache
 from logger import logger
 from misc import (
     Candle,
@@ -13,9 +14,9 @@ from misc import (
     LiquidationSet,
     PositionToOpen,
     TPLimitOrderToPlace,
+    datetime_from_ms,
 )
-import pandas as pd
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
 from discord_client import USE_DISCORD, get_discord_table
 
@@ -24,6 +25,14 @@ TICKER: str = "BTC/USDT:USDT"
 EXCHANGE_PRICE_PRECISION: int = config(
     "EXCHANGE_PRICE_PRECISION", cast=int, default="1"
 )
+
+
+def round_price(price: float) -> float:
+    """Round a price to the exchange precision"""
+
+    return round(price, EXCHANGE_PRICE_PRECISION)
+
+
 BINANCE_EXCHANGE = ccxt.binance()
 
 
@@ -54,22 +63,91 @@ EXCHANGE_CONFIG = {
 
 # trade settings
 LEVERAGE = config("LEVERAGE", cast=int, default="25")
-logger.info(f"{LEVERAGE=}")
+logger.info("LEVERAGE=%r", LEVERAGE)
 USE_FIXED_RISK = config("USE_FIXED_RISK", cast=bool, default=False)
-logger.info(f"{USE_FIXED_RISK=}")
+logger.info("USE_FIXED_RISK=%r", USE_FIXED_RISK)
 if USE_FIXED_RISK:
     FIXED_RISK_EX_FEES = config("FIXED_RISK_EX_FEES", cast=float, default="50.0")
-    logger.info(f"{FIXED_RISK_EX_FEES=}")
+    logger.info("FIXED_RISK_EX_FEES=%r", FIXED_RISK_EX_FEES)
+    FIXED_RISK_USDT_SIZE = FIXED_RISK_EX_FEES * (1 / LEVERAGE * 100)
 else:
     POSITION_PERCENTAGE = config("POSITION_PERCENTAGE", cast=float, default="1.0")
-    logger.info(f"{POSITION_PERCENTAGE=}")
+    logger.info("POSITION_PERCENTAGE=%r", POSITION_PERCENTAGE)
 
 FORBIDDEN_NR_OF_CANDLES_BEFORE_ENTRY = config(
     "FORBIDDEN_NR_OF_CANDLES_BEFORE_ENTRY",
-    cast=Csv(int),
+    cast=Csv(int, post_process=frozenset),
     default="1",
 )
 
+ALGORITHM_INPUT_DIR = "algorithm_input"
+
+
+def read_algorithm_input(
+    strategy_type: str, input_date: date
+) -> List[Tuple[float, float, float] | None]:
+    """Read the algorithm input file for the given strategy type and date into a
+    list indexed by hour holding (tp, sl, weight) for the hours to trade, cached
+    until the input folder or the file itself changes"""
+
+    file_path = _algorithm_input_path(
+        strategy_type, input_date, os.stat(ALGORITHM_INPUT_DIR).st_mtime_ns
+    )
+    return _parse_algorithm_input(file_path, os.stat(file_path).st_mtime_ns)
+
+
+def read_algorithm_inputs(
+    input_date: date, hour: int
+) -> Tuple[Tuple[float, float, float] | None, Tuple[float, float, float] | None]:
+    """Look up the live and reversed (tp, sl, weight) for the given date and hour
+    in one go, None for a strategy type that does not trade that hour"""
+
+    return (
+        read_algorithm_input("live", input_date)[hour],
+        read_algorithm_input("reversed", input_date)[hour],
+    )
+
+
+@lru_cache(maxsize=64)
+def _algorithm_input_path(
+    strategy_type: str, input_date: date, dir_mtime_ns: int
+) -> str:
+    """Resolve the algorithm input file, dir_mtime_ns only serves as cache key"""
+
+    # try the current day first, otherwise use the last file for the strategy type
+    file_path = (
+        f"{ALGORITHM_INPUT_DIR}/algorithm_input-{input_date}-{strategy_type}.csv"
+    )
+    if os.path.isfile(file_path):
+        return file_path
+    suffix = f"-{strategy_type}.csv"
+    with os.scandir(ALGORITHM_INPUT_DIR) as entries:
+        return max(
+            entry.path
+            for entry in entries
+            if entry.name.startswith("algorithm_input-")
+            and entry.name.endswith(suffix)
+            and entry.is_file(follow_symlinks=False)
+        )
+
+
+@lru_cache(maxsize=32)
+def _parse_algorithm_input(
+    file_path: str, file_mtime_ns: int
+) -> List[Tuple[float, float, float] | None]:
+    """Parse the algorithm input file, file_mtime_ns only serves as cache key"""
+
+    params_by_hour: List[Tuple[float, float, float] | None] = [None] * 24
+    with open(file_path, newline="") as file:
+        for row in csv.DictReader(file):
+            if row["trade"].strip().lower() == "true":
+                params_by_hour[int(row["hour"])] = (
+                    float(row["tp"]),
+                    float(row["sl"]),
+                    float(row["weight"]),
+                )
+    return params_by_hour
+
 
 class Exchange:
     """Exchange class to handle the exchange"""
@@ -81,8 +159,9 @@ class Exchange:
             config=EXCHANGE_CONFIG
         )
         self.liquidation_set: LiquidationSet = liquidation_set
-        self.tp_limit_orders_to_place: List[TPLimitOrderToPlace] = []
-        self.positions_to_open: List[PositionToOpen] = []
+        # keyed by the entry order id
+        self.tp_limit_orders_to_place: Dict[str, TPLimitOrderToPlace] = {}
+        self.positions_to_open: Dict[str, PositionToOpen] = {}  # keyed by _id
         self.positions: List[dict] = []
         self.market_sl_orders: List[dict] = []
         self.limit_orders: List[dict] = []
@@ -99,13 +178,13 @@ class Exchange:
                 {
                     "amount": f"{position.get("info", {}).get("positions")} contract(s)",
                     "direction": position.get("info", {}).get("positionSide", ""),
-                    "price": f"$ {round(float(position.get("info", {}).get("averagePrice", 0.0)), EXCHANGE_PRICE_PRECISION):,}",
-                    "liquidation_price": f"$ {round(float(position.get("info", {}).get("liquidationPrice", 0.0)), EXCHANGE_PRICE_PRECISION):,}",
+                    "price": f"$ {round_price(float(position.get("info", {}).get("averagePrice", 0.0))):,}",
+                    "liquidation_price": f"$ {round_price(float(position.get("info", {}).get("liquidationPrice", 0.0))):,}",
                 }
                 for position in positions
             ]
         except Exception as e:
-            logger.error(f"Error fetching positions: {e}")
+            logger.error("Error fetching positions: %s", e)
             open_positions = []
             if USE_DISCORD:
                 self.discord_message_queue.append(
@@ -126,7 +205,7 @@ class Exchange:
                     "amount": f"{order.get("info", {}).get("size")} contract(s)",
                     "direction": order.get("info", {}).get("positionSide", ""),
                     "price": (
-                        f"$ {round(float(order.get("info", {}).get("slTriggerPrice", 0.0)), EXCHANGE_PRICE_PRECISION):,}"
+                        f"$ {round_price(float(order.get("info", {}).get("slTriggerPrice", 0.0))):,}"
                         if order.get("info", {}).get("slTriggerPrice")
                         else "-"
                     ),
@@ -134,7 +213,7 @@ class Exchange:
                 for order in open_orders
             ]
         except Exception as e:
-            logger.error(f"Error fetching open orders: {e}")
+            logger.error("Error fetching open orders: %s", e)
             market_sl_orders_info = []
             if USE_DISCORD:
                 self.discord_message_queue.append(
@@ -154,12 +233,12 @@ class Exchange:
                 {
                     "amount": f"{order.get("amount", 0.0)} contract(s)",
                     "direction": order.get("info", {}).get("side", ""),
-                    "price": f"$ {round(float(order.get("info", {}).get("price", 0.0)), EXCHANGE_PRICE_PRECISION):,}",
+                    "price": f"$ {round_price(float(order.get("info", {}).get("price", 0.0))):,}",
                 }
                 for order in open_orders
             ]
         except Exception as e:
-            logger.error(f"Error fetching open limit orders: {e}")
+            logger.error("Error fetching open limit orders: %s", e)
             limit_orders_info = []
             if USE_DISCORD:
                 self.discord_message_queue.append(
@@ -208,7 +287,7 @@ class Exchange:
                     + stripes
                 )
 
-            logger.info(f"{open_positions_and_orders=}")
+            logger.info("open_positions_and_orders=%r", open_positions_and_orders)
             if USE_DISCORD:
                 self.discord_message_queue.append(
                     DiscordMessage(
@@ -229,7 +308,7 @@ class Exchange:
                 )
             )
         except Exception as e:
-            logger.warning(f"Error settings leverage: {e}")
+            logger.warning("Error settings leverage: %s", e)
 
     async def get_last_candle(self, now: datetime) -> Candle | None:
         """Get the last candle from Binance exchange"""
@@ -245,10 +324,10 @@ class Exchange:
                 limit=2,
             )
             candle: Candle = Candle(*last_candles[0])
-            logger.info(f"{candle=}")
+            logger.info("candle=%r", candle)
             return candle
         except Exception as e:
-            logger.error(f"Error fetching ohlcv: {e}")
+            logger.error("Error fetching ohlcv: %s", e)
             if USE_DISCORD:
                 self.discord_message_queue.append(
                     DiscordMessage(
@@ -272,14 +351,14 @@ class Exchange:
 
             # calculate position size
             if USE_FIXED_RISK:
-                usdt_size: float = FIXED_RISK_EX_FEES * (1 / LEVERAGE * 100)
+                usdt_size: float = FIXED_RISK_USDT_SIZE
             else:
                 usdt_size: float = total_balance / LEVERAGE * POSITION_PERCENTAGE
             position_size: float = round(usdt_size / price * LEVERAGE * 1000, 1)
 
         except Exception as e:
             position_size = 0.1
-            logger.error(f"Error setting position size: {e}")
+            logger.error("Error setting position size: %s", e)
             if USE_DISCORD:
                 self.discord_message_queue.append(
                     DiscordMessage(
@@ -294,12 +373,12 @@ class Exchange:
         # set the position sizes if they are not set yet
         if not hasattr(self, "_position_size"):
             self._position_size = position_size
-            logger.info(f"Initial {self._position_size=}")
+            logger.info("Initial self._position_size=%r", self._position_size)
             return
 
         # set the position sizes if they have changed
         if position_size != self._position_size:
-            logger.info(f"{position_size=}")
+            logger.info("position_size=%r", position_size)
             self._position_size = position_size
 
     @property
@@ -310,8 +389,9 @@ class Exchange:
 
     async def handle_position_to_open(
         self, position_to_open: PositionToOpen, last_candle: Candle
-    ) -> None:
-        """Handle 1 position inside self.positions_to_open"""
+    ) -> bool:
+        """Handle 1 position inside self.positions_to_open, returns True if orders
+        were placed on the exchange"""
 
         long_above: bool = (
             position_to_open.long_above
@@ -332,18 +412,18 @@ class Exchange:
 
         # should the trade be canceled due to price moving above cancel_above?
         if cancel_above or cancel_below:
-            self.positions_to_open.remove(position_to_open)
+            del self.positions_to_open[position_to_open._id]
             canceling_position_log_info = {
                 "_id": position_to_open._id,
                 "price": (
-                    f"$ {round(last_candle.close, EXCHANGE_PRICE_PRECISION):,} is "
+                    f"$ {round_price(last_candle.close):,} is "
                     + (f"above" if cancel_above else "below")
-                    + f" $ {round((position_to_open.cancel_above if cancel_above else position_to_open.cancel_below), EXCHANGE_PRICE_PRECISION):,}"
+                    + f" $ {round_price(position_to_open.cancel_above if cancel_above else position_to_open.cancel_below):,}"
                 ),
                 "status": "canceled",
                 "reason": "price moved beyond 'no order' threshold",
             }
-            logger.info(f"{canceling_position_log_info=}")
+            logger.info("canceling_position_log_info=%r", canceling_position_log_info)
             if USE_DISCORD:
                 self.discord_message_queue.append(
                     DiscordMessage(
@@ -351,40 +431,42 @@ class Exchange:
                         messages=[get_discord_table(canceling_position_log_info)],
                     )
                 )
-            return
+            return False
 
         # are conditions not met to open a position?
         if not long_above and not short_below:
             logger.info(
-                f"Conditions for {position_to_open._id} not met to open position around {last_candle.close=}"
+                "Conditions for %s not met to open position around last_candle.close=%r",
+                position_to_open._id,
+                last_candle.close,
             )
-            return
+            return False
 
         # at this point, we either enter or cancel
-        self.positions_to_open.remove(position_to_open)
+        del self.positions_to_open[position_to_open._id]
 
         # calculate number of candles before entry
-        first_candle_after_confirmation = datetime.fromtimestamp(
+        first_candle_after_confirmation = (
             position_to_open.liquidation.time
-        ) + (position_to_open.candles_before_confirmation + 1) * timedelta(minutes=5)
+            + (position_to_open.candles_before_confirmation + 1) * 300
+        )
         nr_of_candles_before_entry = (
-            self.scanner.now.replace(second=0, microsecond=0)
-            - first_candle_after_confirmation
-        ).seconds // 300
-        logger.info(f"{nr_of_candles_before_entry=}")
+            int(self.scanner.now_floor.timestamp()) - first_candle_after_confirmation
+        ) // 300
+        logger.info("nr_of_candles_before_entry=%r", nr_of_candles_before_entry)
 
         if nr_of_candles_before_entry in FORBIDDEN_NR_OF_CANDLES_BEFORE_ENTRY:
             canceling_position_log_info = {
                 "_id": position_to_open._id,
                 "price": (
-                    f"$ {round(last_candle.close, EXCHANGE_PRICE_PRECISION):,} is "
+                    f"$ {round_price(last_candle.close):,} is "
                     + (f"above" if long_above else "below")
-                    + f" $ {round((position_to_open.long_above if long_above else position_to_open.short_below), EXCHANGE_PRICE_PRECISION):,}"
+                    + f" $ {round_price(position_to_open.long_above if long_above else position_to_open.short_below):,}"
                 ),
                 "status": "canceled",
                 "reason": f"number of candles before entry can not be {nr_of_candles_before_entry}",
             }
-            logger.info(f"{canceling_position_log_info=}")
+            logger.info("canceling_position_log_info=%r", canceling_position_log_info)
             if USE_DISCORD:
                 self.discord_message_queue.append(
                     DiscordMessage(
@@ -392,12 +474,13 @@ class Exchange:
                         messages=[get_discord_table(canceling_position_log_info)],
                     )
                 )
-            return
+            return False
 
         # long_above or short_below conditions met, open position
         logger.info(
-            f"Conditions met to open {'LONG' if long_above else 'SHORT'} "
-            + f"position around {last_candle.close=}"
+            "Conditions met to open %s position around last_candle.close=%r",
+            "LONG" if long_above else "SHORT",
+            last_candle.close,
         )
         if USE_DISCORD:
             prive_above_or_below = (
@@ -408,9 +491,9 @@ class Exchange:
             entering_position_log_info = {
                 "_id": position_to_open._id,
                 "price": (
-                    f"$ {round(last_candle.close, EXCHANGE_PRICE_PRECISION):,} is "
+                    f"$ {round_price(last_candle.close):,} is "
                     + ("above" if long_above else "below")
-                    + f" $ {round(prive_above_or_below, EXCHANGE_PRICE_PRECISION):,}"
+                    + f" $ {round_price(prive_above_or_below):,}"
                 ),
                 "status": "entering " + (LONG if long_above else SHORT),
             }
@@ -445,7 +528,7 @@ class Exchange:
         )
 
         if USE_DISCORD:
-            await self.post_trade_to_discord(
+            self.post_trade_to_discord(
                 _id=position_to_open.liquidation._id,
                 direction=LONG if long_above else SHORT,
                 price=price,
@@ -454,6 +537,8 @@ class Exchange:
                 amount=amount,
             )
 
+        return True
+
     async def check_if_entry_orders_are_closed(self) -> None:
         """Check if entry limit orders are filled to place take profit limit orders"""
 
@@ -467,7 +552,7 @@ class Exchange:
             )
         except Exception as e:
             orders_info = []
-            logger.error(f"Error fetching order info: {e}")
+            logger.error("Error fetching order info: %s", e)
             if USE_DISCORD:
                 self.discord_message_queue.append(
                     DiscordMessage(
@@ -479,7 +564,7 @@ class Exchange:
                     )
                 )
 
-        for tp_limit_order_to_place in deepcopy(self.tp_limit_orders_to_place):
+        for tp_limit_order_to_place in list(self.tp_limit_orders_to_place.values()):
             await self.handle_tp_limit_order_to_place(
                 orders_info=orders_info,
                 tp_limit_order_to_place=tp_limit_order_to_place,
@@ -496,8 +581,8 @@ class Exchange:
                 str(order_info.get("id")) == str(tp_limit_order_to_place.order_id)
                 and order_info.get("info", {}).get("state") == "filled"
             ):
-                logger.info(f"Limit order filled, time to add take profit")
-                self.tp_limit_orders_to_place.remove(tp_limit_order_to_place)
+                logger.info("Limit order filled, time to add take profit")
+                del self.tp_limit_orders_to_place[tp_limit_order_to_place.order_id]
 
                 # add take profit limit order
                 try:
@@ -518,7 +603,7 @@ class Exchange:
                         ),
                     )
                 except Exception as e:
-                    logger.error(f"Error placing take profit order: {e}")
+                    logger.error("Error placing take profit order: %s", e)
                     if USE_DISCORD:
                         self.discord_message_queue.append(
                             DiscordMessage(
@@ -530,94 +615,51 @@ class Exchange:
                             )
                         )
 
-    async def get_algorithm_input_file(
-        self, strategy_type: str, input_date: date
-    ) -> pd.DataFrame:
-        """Get the algorithm input file for the given strategy type and date"""
+    async def get_algorithm_inputs(
+        self, input_date: date, hour: int
+    ) -> Tuple[Tuple[float, float, float] | None, Tuple[float, float, float] | None]:
+        """Get the live and reversed (tp, sl, weight) for the given date and hour"""
 
-        try:
-            # try the current day first
-            algorithm_input: pd.DataFrame = pd.read_csv(
-                f"algorithm_input/algorithm_input-{input_date}-{strategy_type}.csv"
-            )
-            return algorithm_input
-        except:
-            file_names = os.listdir("algorithm_input/")
-            file_names = [
-                name
-                for name in os.listdir("algorithm_input/")
-                if os.path.isfile(os.path.join("algorithm_input/", name))
-            ]
-            file_names = [
-                name
-                for name in file_names
-                if (name.startswith("algorithm_input-") and strategy_type in name)
-            ]
-            file_names.sort()
-            last_file_name = file_names[-1]
-            algorithm_input: pd.DataFrame = pd.read_csv(
-                f"algorithm_input/{last_file_name}"
-            )
-            return algorithm_input
+        return await to_thread(read_algorithm_inputs, input_date, hour)
 
     async def handle_liquidation(
-        self, liquidation: Liquidation, last_candle: Candle
-    ) -> None:
-        """Handle 1 liquidation inside self.liquidation_set.liquidations"""
-
-        liquidation_datetime: datetime = datetime.fromtimestamp(
-            liquidation.candle.timestamp / 1000
-        )
-        # check if confirmation is within 2 candles after liquidation candle
-        if liquidation_datetime < (
-            self.scanner.now.replace(second=0, microsecond=0) - timedelta(minutes=15)
-        ):
-            logger.info(f"Removing old liquidation: {liquidation._id}")
-            self.liquidation_set.liquidations.remove(liquidation)
-            return
+        self,
+        liquidation: Liquidation,
+        last_candle: Candle,
+        above_price: float,
+        below_price: float,
+    ) -> bool:
+        """Handle 1 liquidation inside self.liquidation_set.liquidations, returns
+        True if the reaction was strong and the liquidation can be removed"""
 
         # if reaction to liquidation is strong, add it to positions to open
-        if await self.reaction_to_liquidation_is_strong(liquidation, last_candle.close):
-            now = self.scanner.now.replace(second=0, microsecond=0)
+        if self.reaction_to_liquidation_is_strong(liquidation, last_candle.close):
+            liquidation_datetime: datetime = datetime_from_ms(
+                liquidation.candle.timestamp
+            )
+            now = self.scanner.now_floor
             candles_before_confirmation = (
                 int(round((now - liquidation_datetime).total_seconds() / 300, 0)) - 1
             )
-            self.liquidation_set.liquidations.remove(liquidation)
 
-            # read live algorithm input file
-            live_trade: bool = False
-            live_algorithm_input: pd.DataFrame = await self.get_algorithm_input_file(
-                strategy_type="live", input_date=liquidation_datetime.date()
+            # look up the live and reversed algorithm input in one go
+            live_params, reversed_params = await self.get_algorithm_inputs(
+                liquidation_datetime.date(), liquidation_datetime.hour
             )
-            for row in live_algorithm_input.itertuples():
-                if row.hour == liquidation_datetime.hour:
-                    live_trade = row.trade
-                    if live_trade:
-                        live_tp: float = row.tp
-                        live_weight: float = row.weight
-                        live_sl: float = row.sl
-
-            # read reversed algorithm input file
-            reversed_trade: bool = False
-            reversed_algorithm_input: pd.DataFrame = (
-                await self.get_algorithm_input_file(
-                    strategy_type="reversed", input_date=liquidation_datetime.date()
-                )
-            )
-            for row in reversed_algorithm_input.itertuples():
-                if row.hour == liquidation_datetime.hour:
-                    reversed_trade = row.trade
-                    if reversed_trade:
-                        reversed_tp: float = row.tp
-                        reversed_weight: float = row.weight
-                        reversed_sl: float = row.sl
+
+            live_trade: bool = live_params is not None
+            if live_trade:
+                live_tp, live_sl, live_weight = live_params
+
+            reversed_trade: bool = reversed_params is not None
+            if reversed_trade:
+                reversed_tp, reversed_sl, reversed_weight = reversed_params
 
             long_above = short_below = short_tp = short_sl = short_weight = long_tp = (
                 long_sl
             ) = long_weight = cancel_above = cancel_below = None
 
             if liquidation.direction == LONG:
-                below_price = round(last_candle.close * 0.995, EXCHANGE_PRICE_PRECISION)
                 if reversed_trade:
                     short_below = below_price
                     short_tp = reversed_tp
@@ -626,7 +668,6 @@ class Exchange:
                 else:
                     cancel_below = below_price
 
-                above_price = round(last_candle.close * 1.005, EXCHANGE_PRICE_PRECISION)
                 if candles_before_confirmation > 1:
                     cancel_above = above_price
                 else:
@@ -639,7 +680,6 @@ class Exchange:
                         cancel_above = above_price
 
             elif liquidation.direction == SHORT:
-                above_price = round(last_candle.close * 1.005, EXCHANGE_PRICE_PRECISION)
                 if reversed_trade:
                     long_above = above_price
                     long_tp = reversed_tp
@@ -648,7 +688,6 @@ class Exchange:
                 else:
                     cancel_above = above_price
 
-                below_price = round(last_candle.close * 0.995, EXCHANGE_PRICE_PRECISION)
                 if candles_before_confirmation > 1:
                     cancel_below = below_price
                 else:
@@ -663,9 +702,11 @@ class Exchange:
             if cancel_above and cancel_below:
                 # both cancel_above and cancel_below are set, no need to place order
                 logger.info(
-                    f"Both cancel_above and cancel_below are set for liquidation {liquidation._id}, skipping position to open."
+                    "Both cancel_above and cancel_below are set for liquidation %s, "
+                    "skipping position to open.",
+                    liquidation._id,
                 )
-                return
+                return True
 
             position_to_open = PositionToOpen(
                 _id=liquidation._id,
@@ -682,10 +723,10 @@ class Exchange:
                 cancel_above=cancel_above,
                 cancel_below=cancel_below,
             )
-            self.positions_to_open.append(position_to_open)
+            self.positions_to_open[position_to_open._id] = position_to_open
             if USE_DISCORD:
                 position_to_enter_log_info = position_to_open.init_message_dict()
-                logger.info(f"{position_to_enter_log_info=}")
+                logger.info("position_to_enter_log_info=%r", position_to_enter_log_info)
                 self.discord_message_queue.append(
                     DiscordMessage(
                         channel_id=DISCORD_CHANNEL_WAITING_ID,
@@ -695,22 +736,52 @@ class Exchange:
                         at_everyone=USE_AT_EVERYONE,
                     )
                 )
+            return True
+        return False
 
     async def run_loop(self, last_candle: Candle) -> None:
         """Run the loop for the exchange"""
 
-        for position_to_open in deepcopy(self.positions_to_open):
-            await self.handle_position_to_open(position_to_open, last_candle)
-            await sleep(1)
+        for position_to_open in list(self.positions_to_open.values()):
+            # only pause between orders actually sent to the exchange
+            if await self.handle_position_to_open(position_to_open, last_candle):
+                await sleep(1)
 
         if self.tp_limit_orders_to_place:
             await self.check_if_entry_orders_are_closed()
 
-        # loop over detected liquidations
-        for liquidation in deepcopy(self.liquidation_set.liquidations):
-            await self.handle_liquidation(liquidation, last_candle)
+        # order thresholds around the last close, shared by all liquidations
+        above_price = round_price(last_candle.close * 1.005)
+        below_price = round_price(last_candle.close * 0.995)
 
-    async def reaction_to_liquidation_is_strong(
+        # confirmation must be within 2 candles after the liquidation candle
+        cutoff_ms = int(
+            (self.scanner.now_floor - timedelta(minutes=15)).timestamp() * 1000
+        )
+        for liquidation in self.liquidation_set.remove_liquidations_before(cutoff_ms):
+            logger.info("Removing old liquidation: %s", liquidation._id)
+
+        # handle detected liquidations concurrently, they only read the algorithm
+        # input files, and remove the handled ones from the set in one pass
+        liquidations = list(self.liquidation_set.liquidations)
+        handled = await gather(
+            *(
+                self.handle_liquidation(
+                    liquidation, last_candle, above_price, below_price
+                )
+                for liquidation in liquidations
+            )
+        )
+        if any(handled):
+            self.liquidation_set.remove_liquidations(
+                [
+                    liquidation
+                    for liquidation, is_handled in zip(liquidations, handled)
+                    if is_handled
+                ]
+            )
+
+    def reaction_to_liquidation_is_strong(
         self, liquidation: Liquidation, price: float
     ) -> bool:
         """Check if the reaction to the liquidation is strong enough to place an
@@ -722,7 +793,7 @@ class Exchange:
             return True
         return False
 
-    async def get_sl_and_tp_price(
+    def get_sl_and_tp_price(
         self,
         direction: str,
         price: float,
@@ -733,18 +804,14 @@ class Exchange:
         direction"""
 
         stoploss_price = (
-            round(price * (1 - (stoploss_percentage / 100)), EXCHANGE_PRICE_PRECISION)
+            round_price(price * (1 - (stoploss_percentage / 100)))
             if direction == LONG
-            else round(
-                price * (1 + (stoploss_percentage / 100)), EXCHANGE_PRICE_PRECISION
-            )
+            else round_price(price * (1 + (stoploss_percentage / 100)))
         )
         takeprofit_price = (
-            round(price * (1 + (takeprofit_percentage / 100)), EXCHANGE_PRICE_PRECISION)
+            round_price(price * (1 + (takeprofit_percentage / 100)))
             if direction == LONG
-            else round(
-                price * (1 - (takeprofit_percentage / 100)), EXCHANGE_PRICE_PRECISION
-            )
+            else round_price(price * (1 - (takeprofit_percentage / 100)))
         )
         return stoploss_price, takeprofit_price
 
@@ -755,7 +822,7 @@ class Exchange:
             ticker_data = await self.exchange.fetch_ticker(symbol=TICKER)
             return ticker_data["last"]
         except Exception as e:
-            logger.error(f"Error fetching ticker: {e}")
+            logger.error("Error fetching ticker: %s", e)
             if USE_DISCORD:
                 self.discord_message_queue.append(
                     DiscordMessage(
@@ -781,17 +848,17 @@ class Exchange:
             Tuple[float, float, float]: The price, stoploss price, and takeprofit price
         """
 
-        logger.info(f"Placing {direction} order")
+        logger.info("Placing %s order", direction)
         order = None
 
         try:
             price = await self.get_price()
             price = (
-                round(price * 1.0001, EXCHANGE_PRICE_PRECISION)
+                round_price(price * 1.0001)
                 if direction == SHORT
-                else round(price * 0.9999, EXCHANGE_PRICE_PRECISION)
+                else round_price(price * 0.9999)
             )
-            stoploss_price, takeprofit_price = await self.get_sl_and_tp_price(
+            stoploss_price, takeprofit_price = self.get_sl_and_tp_price(
                 direction, price, stoploss_percentage, takeprofit_percentage
             )
             order: dict = await self.exchange.create_order(
@@ -807,17 +874,16 @@ class Exchange:
                 ),
             )
 
-            # add to tp limit orders to place list
-            self.tp_limit_orders_to_place.append(
-                TPLimitOrderToPlace(
-                    order_id=str(order.get("id")),
-                    direction=direction,
-                    amount=amount,
-                    takeprofit_price=takeprofit_price,
-                )
+            # add to tp limit orders to place
+            order_id = str(order.get("id"))
+            self.tp_limit_orders_to_place[order_id] = TPLimitOrderToPlace(
+                order_id=order_id,
+                direction=direction,
+                amount=amount,
+                takeprofit_price=takeprofit_price,
             )
         except Exception as e:
-            logger.error(f"Error placing order: {e}")
+            logger.error("Error placing order: %s", e)
             if USE_DISCORD:
                 self.discord_message_queue.append(
                     DiscordMessage(
@@ -830,7 +896,7 @@ class Exchange:
                 )
         return price, stoploss_price, takeprofit_price
 
-    async def post_trade_to_discord(
+    def post_trade_to_discord(
         self,
         _id: str,
         direction: str,
@@ -845,11 +911,11 @@ class Exchange:
                 _id=_id,
                 amount=f"{amount} contract(s)",
                 direction=direction,
-                price=f"$ {round(price, EXCHANGE_PRICE_PRECISION):,}",
-                stop_loss=f"$ {round(stoploss_price, EXCHANGE_PRICE_PRECISION):,}",
-                take_profit=f"$ {round(takeprofit_price, EXCHANGE_PRICE_PRECISION):,}",
+                price=f"$ {round_price(price):,}",
+                stop_loss=f"$ {round_price(stoploss_price):,}",
+                take_profit=f"$ {round_price(takeprofit_price):,}",
             )
-            logger.info(f"{order_log_info=}")
+            logger.info("order_log_info=%r", order_log_info)
             if USE_DISCORD:
                 self.discord_message_queue.append(
                     DiscordMessage(
@@ -861,7 +927,7 @@ class Exchange:
                     )
                 )
         except Exception as e:
-            logger.error(f"Error posting order to discord: {e}")
+            logger.error("Error posting order to discord: %s", e)
             if USE_DISCORD:
                 self.discord_message_queue.append(
                     DiscordMessage(
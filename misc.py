@@ -1,12 +1,48 @@
 from __future__ import annotations
-from copy import deepcopy
-from dataclasses import dataclass
+from asyncio import Event, sleep, wait_for
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from decouple import config
+from functools import lru_cache
 from typing import List
 from logger import logger
 
 
-@dataclass
+# oldest liquidations are dropped once the set holds this many
+MAX_LIQUIDATIONS = config("MAX_LIQUIDATIONS", default="2048", cast=int)
+
+
+@lru_cache(maxsize=1024)
+def datetime_from_ms(timestamp: int) -> datetime:
+    """Convert a millisecond timestamp (e.g. of a candle) to a local datetime."""
+
+    return datetime.fromtimestamp(timestamp / 1000)
+
+
+def next_minute(now: datetime) -> datetime:
+    """Return the start of the minute following now."""
+
+    return now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+
+
+async def sleep_until(moment: datetime, stop: Event | None = None) -> bool:
+    """Sleep until the wall clock reaches moment, returns False if stop was set
+    before that."""
+
+    while (delay := (moment - datetime.now()).total_seconds()) > 0:
+        if stop is None:
+            await sleep(delay)
+            continue
+        try:
+            await wait_for(stop.wait(), timeout=delay)
+            return False
+        except TimeoutError:
+            pass
+    return stop is None or not stop.is_set()
+
+
+@dataclass(slots=True)
 class Candle:
     """Candle class to hold the candle data"""
 
@@ -19,7 +55,7 @@ class Candle:
     time_frame: str = "5m"  # Default time frame
 
 
-@dataclass
+@dataclass(slots=True)
 class Liquidation:
     """Liquidation class to hold the liquidation data"""
 
@@ -36,20 +72,22 @@ class Liquidation:
     def to_dict(self) -> dict:
         """Convert the Liquidation instance to a json dumpable dictionary."""
 
-        liquidation_dict = deepcopy(self.__dict__)
-        liquidation_dict["amount"] = f"$ {round(self.amount, 2):,}"
-        del liquidation_dict["time"]
-        del liquidation_dict["candle"]
-        del liquidation_dict["time_frame"]
-        del liquidation_dict["nr_of_liquidations"]
-        return liquidation_dict
+        return {
+            "_id": self._id,
+            "amount": f"$ {round(self.amount, 2):,}",
+            "direction": self.direction,
+            "on_liquidation_days": self.on_liquidation_days,
+            "during_liquidation_hours": self.during_liquidation_hours,
+        }
 
 
-@dataclass
+@dataclass(slots=True)
 class LiquidationSet:
     """LiquidationSet class to hold a set of liquidations"""
 
-    liquidations: list[Liquidation]
+    liquidations: deque[Liquidation] = field(
+        default_factory=lambda: deque(maxlen=MAX_LIQUIDATIONS)
+    )
 
     def total_liquidations(self, direction: str) -> int:
         """Return the total number of liquidations in the set for a given direction."""
@@ -76,20 +114,48 @@ class LiquidationSet:
             liquidations=[liquidation.to_dict() for liquidation in self.liquidations]
         )
 
+    def remove_liquidations_before(self, cutoff_ms: int) -> List[Liquidation]:
+        """Remove and return the liquidations whose candle started before cutoff_ms.
+        New liquidations are prepended, so the oldest ones sit at the right end."""
+
+        removed = []
+        while self.liquidations and self.liquidations[-1].candle.timestamp < cutoff_ms:
+            removed.append(self.liquidations.pop())
+        return removed
+
+    def remove_liquidations(self, handled: List[Liquidation]) -> None:
+        """Remove the handled liquidations in one pass, rebuilding in place since
+        callers may hold a reference to the deque"""
+
+        handled_ids = {id(liquidation) for liquidation in handled}
+        remaining = [
+            liquidation
+            for liquidation in self.liquidations
+            if id(liquidation) not in handled_ids
+        ]
+        self.liquidations.clear()
+        self.liquidations.extend(remaining)
+
     def remove_old_liquidations(self, now: datetime) -> None:
         """Remove liquidations older than 10 minutes (5m + beginning of candle = 10)."""
 
+        now_rounded = now.replace(second=0, microsecond=0)
+        cutoff = (now_rounded - timedelta(minutes=10)).timestamp()
         try:
-            for liquidation in self.liquidations:
-                now_rounded = now.replace(second=0, microsecond=0)
-                if liquidation.time < (now_rounded - timedelta(minutes=10)).timestamp():
-                    self.liquidations.remove(liquidation)
+            # rebuild in place, callers may hold a reference to the deque
+            recent = [
+                liquidation
+                for liquidation in self.liquidations
+                if liquidation.time >= cutoff
+            ]
+            self.liquidations.clear()
+            self.liquidations.extend(recent)
         except Exception as e:
-            logger.error(f"Error removing old liquidations: {e}")
-            self.liquidations = []
+            logger.error("Error removing old liquidations: %s", e)
+            self.liquidations.clear()
 
 
-@dataclass
+@dataclass(slots=True)
 class PositionToOpen:
     """PositionToOpen class to hold the position to open data"""
 
@@ -134,7 +200,7 @@ class PositionToOpen:
         return message_dict
 
 
-@dataclass
+@dataclass(slots=True)
 class DiscordMessage:
     """DiscordMessage class to hold the discord message data"""
 
@@ -143,7 +209,7 @@ class DiscordMessage:
     at_everyone: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class TPLimitOrderToPlace:
     """TPLimitOrderToPlace class to hold the take profit limit order data"""
 
@@ -3,22 +3,18 @@ Paper Trading Bot - Simulates trading using real market data with fake money.
 Reuses original CoinalyzeScanner and mirrors Exchange logic.
 """
 
-from asyncio import run, sleep
-from copy import deepcopy
+from asyncio import Event, Task, create_task, gather, get_running_loop, run, sleep
+from bisect import bisect_left, bisect_right, insort
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import List, Optional, Tuple
+from math import inf
+from typing import Dict, List, Optional, Tuple
 import signal
-import sys
-import os
 
 # Import original bot components
 from coinalyze_scanner import (
     CoinalyzeScanner, 
     COINALYZE_LIQUIDATION_URL,
-    MINIMAL_LIQUIDATION,
-    MINIMAL_NR_OF_LIQUIDATIONS,
-    LIQUIDATION_DAYS,
     LIQUIDATION_HOURS,
     N_MINUTES_TIMEDELTA,
     INTERVAL,
@@ -26,27 +22,46 @@ from coinalyze_scanner import (
 from exchange import (
     TICKER,
     LEVERAGE,
-    EXCHANGE_PRICE_PRECISION,
+    round_price,
     BINANCE_EXCHANGE,
     LONG,
     SHORT,
     FORBIDDEN_NR_OF_CANDLES_BEFORE_ENTRY,
+    USE_FIXED_RISK,
+    read_algorithm_inputs,
 )
 from logger import logger
-from misc import Candle, Liquidation, LiquidationSet, PositionToOpen
-import pandas as pd
+from misc import (
+    Candle,
+    Liquidation,
+    LiquidationSet,
+    PositionToOpen,
+    datetime_from_ms,
+    next_minute,
+    sleep_until,
+)
 
 
 # ================================================================
 # Configuration
 # ================================================================
 STARTING_BALANCE = 1000.0
+POSITION_TO_OPEN_MAX_AGE = timedelta(minutes=30)  # drop pending entries older than this
+
+# Price move sign per direction: +1 profits from a rise, -1 from a fall
+DIRECTION_SIGN = {LONG: 1, SHORT: -1}
+
+if not USE_FIXED_RISK:
+    from exchange import POSITION_PERCENTAGE
+
+    # Nominal position size per $ of balance: POSITION_PERCENTAGE * LEVERAGE
+    POSITION_SIZE_FACTOR = POSITION_PERCENTAGE / 100 * LEVERAGE
 
 
 # ================================================================
 # Data Classes for Paper Trading
 # ================================================================
-@dataclass
+@dataclass(slots=True, frozen=True)
 class PaperPosition:
     """Represents an open paper position"""
     order_id: int
@@ -59,7 +74,7 @@ class PaperPosition:
     liquidation_id: str
 
 
-@dataclass
+@dataclass(slots=True)
 class PaperOrder:
     """Represents a pending paper order (waiting for price to hit entry)"""
     order_id: int
@@ -95,8 +110,14 @@ class PaperExchange:
         
         # Order tracking
         self.order_id_counter = 0
-        self.positions: List[PaperPosition] = []
-        self.positions_to_open: List[PositionToOpen] = []
+        self.positions: Dict[int, PaperPosition] = {}  # keyed by order_id
+        self.positions_to_open: Dict[str, PositionToOpen] = {}  # keyed by _id
+        
+        # Sorted (trigger price, order_id) of the open positions, upper triggers
+        # fire when the price rises to them (long TP, short SL) and lower
+        # triggers when it falls to them (long SL, short TP)
+        self._upper_triggers: List[Tuple[float, int]] = []
+        self._lower_triggers: List[Tuple[float, int]] = []
         
         # Statistics
         self.total_trades = 0
@@ -107,71 +128,94 @@ class PaperExchange:
         # Position sizing (matches original bot)
         self._position_size = 0
         
+        # Websocket buffers (filled by the stream tasks, keyed by candle timestamp)
+        self._candles: Dict[int, Candle] = {}
+        self._stream_tasks: List[Task] = []
+        self._last_candle: Optional[Tuple[int, Candle]] = None  # (since, candle)
+        
         logger.info(f"💰 Starting balance: ${starting_balance:,.2f}")
     
-    async def set_leverage(self, symbol: str, leverage: int, direction: str) -> None:
-        """Simulate setting leverage"""
-        pass  # Silently set leverage
+    def start_streams(self) -> None:
+        """Subscribe to the Binance candle websocket stream"""
+        self._stream_tasks = [create_task(self._watch_ohlcv())]
+    
+    async def stop_streams(self) -> None:
+        """Cancel the websocket stream tasks"""
+        for task in self._stream_tasks:
+            task.cancel()
+        await gather(*self._stream_tasks, return_exceptions=True)
+        self._stream_tasks = []
+    
+    async def _watch_ohlcv(self) -> None:
+        """Keep the most recent 5m candles pushed by the websocket in memory"""
+        while True:
+            try:
+                ohlcv = await BINANCE_EXCHANGE.watch_ohlcv(TICKER, "5m")
+            except Exception as e:
+                logger.error("[%s] Error watching candles: %s", self.mode, e)
+                await sleep(1)
+                continue
+            for row in ohlcv:
+                self._candles[row[0]] = Candle(*row)
+            # Only the current and previous candles are ever needed
+            if self._candles:
+                newest = max(self._candles)
+                for timestamp in [t for t in self._candles if t < newest - 600_000]:
+                    del self._candles[timestamp]
     
     async def get_last_candle(self, now: datetime) -> Optional[Candle]:
         """Get the last candle from Binance (real data)"""
+        now_minus_5m = now.replace(
+            minute=now.minute - now.minute % 5, second=0, microsecond=0
+        ) - timedelta(minutes=5)
+        since = int(now_minus_5m.timestamp() * 1000)
+        
+        # Same 5 minute window as the previous call
+        if self._last_candle and self._last_candle[0] == since:
+            return self._last_candle[1]
+        
+        # The candle is closed once the websocket has pushed the next one
+        if since in self._candles and since + 300_000 in self._candles:
+            self._last_candle = (since, self._candles[since])
+            return self._candles[since]
+        
         try:
-            now_minus_5m = now.replace(
-                minute=now.minute - now.minute % 5, second=0, microsecond=0
-            ) - timedelta(minutes=5)
             last_candles = await BINANCE_EXCHANGE.fetch_ohlcv(
                 symbol=TICKER,
                 timeframe="5m",
-                since=int(now_minus_5m.timestamp() * 1000),
+                since=since,
                 limit=2,
             )
             candle = Candle(*last_candles[0])
+            self._last_candle = (since, candle)
             return candle
         except Exception as e:
-            logger.error(f"[{self.mode}] Error fetching candle: {e}")
-            return None
-    
-    async def get_price(self) -> Optional[float]:
-        """Get current price from Binance"""
-        try:
-            ticker = await BINANCE_EXCHANGE.fetch_ticker(symbol=TICKER)
-            return ticker["last"]
-        except Exception as e:
-            logger.error(f"[{self.mode}] Error fetching price: {e}")
+            logger.error("[%s] Error fetching candle: %s", self.mode, e)
             return None
     
-    async def set_position_sizes(self) -> None:
+    def set_position_sizes(self) -> None:
         """Calculate position size based on balance"""
         try:
             # Position size in USD (total value of position)
             # Example: $1,000 balance * 1% position * 25x leverage = $250 nominal
             # For simplicity, we use POSITION_PERCENTAGE * balance * LEVERAGE
-            from exchange import POSITION_PERCENTAGE
-            self._position_size = self.balance * (POSITION_PERCENTAGE / 100) * LEVERAGE
+            self._position_size = self.balance * POSITION_SIZE_FACTOR
         except Exception as e:
-            logger.error(f"[{self.mode}] Error setting position size: {e}")
+            logger.error("[%s] Error setting position size: %s", self.mode, e)
     
     @property
     def position_size(self) -> float:
         return self._position_size
     
-    def get_algorithm_input_file(self, strategy_type: str, input_date) -> pd.DataFrame:
-        """Get algorithm input file (matches original bot)"""
+    def get_algorithm_inputs(self, input_date, hour: int) -> tuple:
+        """Get live and reversed (tp, sl, weight) for the hour (matches original bot)"""
         try:
-            file_names = [
-                name
-                for name in os.listdir("algorithm_input")
-                if name.endswith(".csv") and strategy_type in name
-            ]
-            if not file_names:
-                return pd.DataFrame()
-            file_names.sort()
-            return pd.read_csv(f"algorithm_input/{file_names[-1]}")
+            return read_algorithm_inputs(input_date, hour)
         except Exception as e:
-            logger.error(f"[{self.mode}] Error reading algorithm file: {e}")
-            return pd.DataFrame()
+            logger.error("[%s] Error reading algorithm file: %s", self.mode, e)
+            return None, None
     
-    async def reaction_to_liquidation_is_strong(
+    def reaction_to_liquidation_is_strong(
         self, liquidation: Liquidation, price: float
     ) -> bool:
         """Check if price reaction is strong (matches original)"""
@@ -181,58 +225,43 @@ class PaperExchange:
             return True
         return False
     
-    async def handle_liquidation(
-        self, liquidation: Liquidation, last_candle: Candle
-    ) -> None:
-        """Handle a single liquidation (mirrors original Exchange.handle_liquidation)"""
-        
-        liquidation_datetime = datetime.fromtimestamp(liquidation.candle.timestamp / 1000)
-        
-        # Remove if older than 15 minutes
-        if liquidation_datetime < (
-            self.scanner.now.replace(second=0, microsecond=0) - timedelta(minutes=15)
-        ):
-            self.liquidation_set.liquidations.remove(liquidation)
-            return
+    def handle_liquidation(
+        self,
+        liquidation: Liquidation,
+        last_candle: Candle,
+        above_price: float,
+        below_price: float,
+    ) -> bool:
+        """Handle a single liquidation, True if it can be removed (mirrors original)"""
         
         # Check if reaction is strong enough
-        if not await self.reaction_to_liquidation_is_strong(liquidation, last_candle.close):
-            return
+        if not self.reaction_to_liquidation_is_strong(liquidation, last_candle.close):
+            return False
         
         # Reaction is strong - prepare trade
-        now = self.scanner.now.replace(second=0, microsecond=0)
+        liquidation_datetime = datetime_from_ms(liquidation.candle.timestamp)
+        now = self.scanner.now_floor
         candles_before_confirmation = (
             int(round((now - liquidation_datetime).total_seconds() / 300, 0)) - 1
         )
-        self.liquidation_set.liquidations.remove(liquidation)
-        
-        # Read algorithm input files
-        live_trade = False
-        live_algorithm_input = self.get_algorithm_input_file("live", liquidation_datetime.date())
-        for row in live_algorithm_input.itertuples():
-            if row.hour == liquidation_datetime.hour:
-                live_trade = row.trade if hasattr(row, 'trade') and row.trade else False
-                if live_trade:
-                    live_tp = row.tp
-                    live_weight = row.weight
-                    live_sl = row.sl
-        
-        reversed_trade = False
-        reversed_algorithm_input = self.get_algorithm_input_file("reversed", liquidation_datetime.date())
-        for row in reversed_algorithm_input.itertuples():
-            if row.hour == liquidation_datetime.hour:
-                reversed_trade = row.trade if hasattr(row, 'trade') and row.trade else False
-                if reversed_trade:
-                    reversed_tp = row.tp
-                    reversed_weight = row.weight
-                    reversed_sl = row.sl
+        
+        # Look up live and reversed algorithm input in one go
+        live_params, reversed_params = self.get_algorithm_inputs(
+            liquidation_datetime.date(), liquidation_datetime.hour
+        )
+        live_trade = live_params is not None
+        if live_trade:
+            live_tp, live_sl, live_weight = live_params
+        
+        reversed_trade = reversed_params is not None
+        if reversed_trade:
+            reversed_tp, reversed_sl, reversed_weight = reversed_params
         
         # Initialize trade parameters
         long_above = short_below = short_tp = short_sl = short_weight = None
         long_tp = long_sl = long_weight = cancel_above = cancel_below = None
         
         if liquidation.direction == LONG:
-            below_price = round(last_candle.close * 0.995, EXCHANGE_PRICE_PRECISION)
             if reversed_trade:
                 short_below = below_price
                 short_tp = reversed_tp
@@ -241,7 +270,6 @@ class PaperExchange:
             else:
                 cancel_below = below_price
             
-            above_price = round(last_candle.close * 1.005, EXCHANGE_PRICE_PRECISION)
             if candles_before_confirmation > 1:
                 cancel_above = above_price
             else:
@@ -254,7 +282,6 @@ class PaperExchange:
                     cancel_above = above_price
         
         elif liquidation.direction == SHORT:
-            above_price = round(last_candle.close * 1.005, EXCHANGE_PRICE_PRECISION)
             if reversed_trade:
                 long_above = above_price
                 long_tp = reversed_tp
@@ -263,7 +290,6 @@ class PaperExchange:
             else:
                 cancel_above = above_price
             
-            below_price = round(last_candle.close * 0.995, EXCHANGE_PRICE_PRECISION)
             if candles_before_confirmation > 1:
                 cancel_below = below_price
             else:
@@ -277,7 +303,7 @@ class PaperExchange:
         
         # Check if both cancel conditions are set (no trade)
         if cancel_above and cancel_below:
-            return
+            return True
         
         # Create position to open
         position_to_open = PositionToOpen(
@@ -295,15 +321,16 @@ class PaperExchange:
             cancel_above=cancel_above,
             cancel_below=cancel_below,
         )
-        self.positions_to_open.append(position_to_open)
+        self.positions_to_open[position_to_open._id] = position_to_open
         
         # Log the waiting condition
         if long_above:
             logger.info(f"⏳ {liquidation._id} waiting: LONG if price > ${long_above:,.1f}")
         if short_below:
             logger.info(f"⏳ {liquidation._id} waiting: SHORT if price < ${short_below:,.1f}")
+        return True
     
-    async def handle_position_to_open(
+    def handle_position_to_open(
         self, position_to_open: PositionToOpen, last_candle: Candle
     ) -> None:
         """Handle a position to open (mirrors original)"""
@@ -327,7 +354,7 @@ class PaperExchange:
         
         # Cancel if price moved to cancel zone
         if cancel_above or cancel_below:
-            self.positions_to_open.remove(position_to_open)
+            del self.positions_to_open[position_to_open._id]
             return
         
         # Conditions not met yet
@@ -335,29 +362,28 @@ class PaperExchange:
             return
         
         # Remove from pending
-        self.positions_to_open.remove(position_to_open)
+        del self.positions_to_open[position_to_open._id]
         
         # Check forbidden candles before entry
-        first_candle_after_confirmation = datetime.fromtimestamp(
-            position_to_open.liquidation.time
-        ) + (position_to_open.candles_before_confirmation + 1) * timedelta(minutes=5)
+        first_candle_after_confirmation = position_to_open.liquidation.time + (
+            position_to_open.candles_before_confirmation + 1
+        ) * 300
         nr_of_candles_before_entry = (
-            self.scanner.now.replace(second=0, microsecond=0)
-            - first_candle_after_confirmation
-        ).seconds // 300
+            int(self.scanner.now_floor.timestamp()) - first_candle_after_confirmation
+        ) // 300
         
         if nr_of_candles_before_entry in FORBIDDEN_NR_OF_CANDLES_BEFORE_ENTRY:
             return
         
         # Execute paper trade
         direction = LONG if long_above else SHORT
-        await self.execute_paper_trade(
+        self.execute_paper_trade(
             direction=direction,
             position_to_open=position_to_open,
             last_candle=last_candle,
         )
     
-    async def execute_paper_trade(
+    def execute_paper_trade(
         self, direction: str, position_to_open: PositionToOpen, last_candle: Candle
     ) -> None:
         """Execute a paper trade"""
@@ -377,13 +403,10 @@ class PaperExchange:
             tp_pct = position_to_open.short_tp
             weight = position_to_open.short_weight
         
-        # Calculate SL/TP prices
-        if direction == LONG:
-            sl_price = round(entry_price * (1 - sl_pct / 100), EXCHANGE_PRICE_PRECISION)
-            tp_price = round(entry_price * (1 + tp_pct / 100), EXCHANGE_PRICE_PRECISION)
-        else:
-            sl_price = round(entry_price * (1 + sl_pct / 100), EXCHANGE_PRICE_PRECISION)
-            tp_price = round(entry_price * (1 - tp_pct / 100), EXCHANGE_PRICE_PRECISION)
+        # Calculate SL/TP prices (SL against, TP with the direction)
+        sign = DIRECTION_SIGN[direction]
+        sl_price = round_price(entry_price * (1 - sign * sl_pct / 100))
+        tp_price = round_price(entry_price * (1 + sign * tp_pct / 100))
         
         # Calculate position size in USD (nominal)
         size = self._position_size * weight
@@ -399,56 +422,61 @@ class PaperExchange:
             timestamp=datetime.now(),
             liquidation_id=position_to_open._id,
         )
-        self.positions.append(position)
+        self.positions[order_id] = position
+        upper_trigger, lower_trigger = self.get_triggers(position)
+        insort(self._upper_triggers, upper_trigger)
+        insort(self._lower_triggers, lower_trigger)
         
         logger.info(f"📋 #{order_id} {direction.upper()} @ ${entry_price:,.1f} | SL: ${sl_price:,.1f} | TP: ${tp_price:,.1f}")
     
-    async def check_positions(self) -> None:
-        """Check if any positions should be closed (SL/TP hit)"""
+    def check_positions(self, price: float) -> None:
+        """Check if any positions should be closed (SL/TP hit) at the given price"""
         
-        price = await self.get_price()
-        if not price:
+        if not self.positions:
             return
         
-        for position in deepcopy(self.positions):
-            should_close = False
-            close_reason = ""
-            close_price = price
-            
-            if position.direction == LONG:
-                if price <= position.stop_loss:
-                    should_close = True
-                    close_reason = "SL"
-                    close_price = position.stop_loss
-                elif price >= position.take_profit:
-                    should_close = True
-                    close_reason = "TP"
-                    close_price = position.take_profit
-            else:  # SHORT
-                if price >= position.stop_loss:
-                    should_close = True
-                    close_reason = "SL"
-                    close_price = position.stop_loss
-                elif price <= position.take_profit:
-                    should_close = True
-                    close_reason = "TP"
-                    close_price = position.take_profit
-            
-            if should_close:
-                await self.close_position(position, close_reason, close_price)
+        # Only the triggers on the wrong side of the price were crossed, slicing
+        # copies them so closing positions can shrink the trigger lists
+        crossed = (
+            self._upper_triggers[: bisect_right(self._upper_triggers, (price, inf))]
+            + self._lower_triggers[bisect_left(self._lower_triggers, (price, -inf)) :]
+        )
+        # A position whose SL and TP round onto each other can cross both lists,
+        # close it only once
+        for order_id in dict.fromkeys(order_id for _, order_id in crossed):
+            position = self.positions[order_id]
+            # Price moved against the position past SL, otherwise with it past TP
+            if DIRECTION_SIGN[position.direction] * (price - position.stop_loss) <= 0:
+                self.close_position(position, "SL", position.stop_loss)
+            else:
+                self.close_position(position, "TP", position.take_profit)
+    
+    @staticmethod
+    def get_triggers(
+        position: PaperPosition,
+    ) -> Tuple[Tuple[float, int], Tuple[float, int]]:
+        """Get the upper and lower (trigger price, order_id) of a position"""
+        upper, lower = position.take_profit, position.stop_loss
+        if position.direction == SHORT:
+            upper, lower = lower, upper
+        return (upper, position.order_id), (lower, position.order_id)
     
-    async def close_position(
+    def close_position(
         self, position: PaperPosition, reason: str, close_price: float
     ) -> None:
         """Close a position and calculate P&L"""
         
-        self.positions.remove(position)
+        del self.positions[position.order_id]
+        upper_trigger, lower_trigger = self.get_triggers(position)
+        del self._upper_triggers[bisect_left(self._upper_triggers, upper_trigger)]
+        del self._lower_triggers[bisect_left(self._lower_triggers, lower_trigger)]
         
         # Calculate P&L
-        if position.direction == LONG:
-            pnl_pct = (close_price - position.entry_price) / position.entry_price
-        else:
-            pnl_pct = (position.entry_price - close_price) / position.entry_price
+        pnl_pct = (
+            DIRECTION_SIGN[position.direction]
+            * (close_price - position.entry_price)
+            / position.entry_price
+        )
         
         pnl = position.size * pnl_pct
         self.balance += pnl
@@ -464,20 +492,49 @@ class PaperExchange:
         
         logger.info(f"{emoji} #{position.order_id} {reason} | P&L: ${pnl:+,.2f} | Bal: ${self.balance:,.2f}")
     
-    async def run_loop(self, last_candle: Candle) -> None:
+    def prune_positions_to_open(self) -> None:
+        """Drop pending positions whose liquidation is older than the max age"""
+        
+        cutoff = (self.scanner.now - POSITION_TO_OPEN_MAX_AGE).timestamp()
+        expired = [
+            _id
+            for _id, position_to_open in self.positions_to_open.items()
+            if position_to_open.liquidation.time < cutoff
+        ]
+        for _id in expired:
+            del self.positions_to_open[_id]
+        if expired:
+            logger.info("⌛ Expired %d pending position(s)", len(expired))
+    
+    def run_loop(self, last_candle: Candle) -> None:
         """Run the main loop (mirrors original)"""
         
-        # Check existing positions for SL/TP
-        await self.check_positions()
+        # Check existing positions for SL/TP against the close of the candle
+        self.check_positions(last_candle.close)
         
-        # Handle pending positions
-        for position_to_open in deepcopy(self.positions_to_open):
-            await self.handle_position_to_open(position_to_open, last_candle)
-            await sleep(0.1)
+        # Expire pending positions whose liquidation is too old to still trade
+        self.prune_positions_to_open()
         
-        # Handle detected liquidations
-        for liquidation in deepcopy(self.liquidation_set.liquidations):
-            await self.handle_liquidation(liquidation, last_candle)
+        # Handle pending positions
+        for position_to_open in list(self.positions_to_open.values()):
+            self.handle_position_to_open(position_to_open, last_candle)
+        
+        # Order thresholds around the last close, shared by all liquidations
+        above_price = round_price(last_candle.close * 1.005)
+        below_price = round_price(last_candle.close * 0.995)
+        
+        # Drop liquidations older than 15 minutes in one pass
+        cutoff_ms = int((self.scanner.now_floor - timedelta(minutes=15)).timestamp() * 1000)
+        self.liquidation_set.remove_liquidations_before(cutoff_ms)
+        
+        # Handle detected liquidations, then remove the handled ones in one pass
+        handled = [
+            liquidation
+            for liquidation in list(self.liquidation_set.liquidations)
+            if self.handle_liquidation(liquidation, last_candle, above_price, below_price)
+        ]
+        if handled:
+            self.liquidation_set.remove_liquidations(handled)
 
 
 # ================================================================
@@ -490,67 +547,25 @@ class PaperScanner(CoinalyzeScanner):
         super().__init__(now, liquidation_set)
         self.mode = mode
     
-    async def handle_liquidation_set(self, candle: Candle, symbols: list) -> None:
+    def handle_liquidation_set(self, candle: Candle, symbols: list) -> None:
         """Handle liquidation set - logs all, trades only during scheduled hours"""
         
-        total_long, total_short = 0, 0
-        l_time = symbols[0].get("t") if len(symbols) else 0
-        nr_of_liquidations = 0
-        
-        for history in symbols:
-            long = history.get("l", 0)
-            total_long += long
-            if long > 100:
-                nr_of_liquidations += 1
-            short = history.get("s", 0)
-            total_short += short
-            if short > 100:
-                nr_of_liquidations += 1
-        
-        # Determine if we should add to liquidation list (for trading)
-        is_trading_day = datetime.fromtimestamp(candle.timestamp / 1000).weekday() in LIQUIDATION_DAYS
-        is_trading_hour = datetime.fromtimestamp(candle.timestamp / 1000).hour in LIQUIDATION_HOURS
-        should_trade = is_trading_day and is_trading_hour
-        
         # Log ALL liquidations above threshold (like original bot)
         # But only add to trade list during scheduled hours
-        if total_long > MINIMAL_LIQUIDATION and nr_of_liquidations >= MINIMAL_NR_OF_LIQUIDATIONS:
-            long_liquidation = Liquidation(
-                _id=f"l-{datetime.fromtimestamp(candle.timestamp / 1000).strftime('%H%M')}",
-                amount=total_long,
-                direction="long",
-                time=l_time,
-                nr_of_liquidations=nr_of_liquidations,
-                candle=candle,
-                on_liquidation_days=is_trading_day,
-                during_liquidation_hours=is_trading_hour,
+        for liquidation in self.detect_liquidations(candle, symbols):
+            should_trade = (
+                liquidation.on_liquidation_days and liquidation.during_liquidation_hours
             )
             # Always log the detection
             trade_status = "📊 WILL TRADE" if should_trade else "👀 (outside trading hours)"
-            logger.info(f"🔔 LONG liquidation: ${total_long:,.0f} {trade_status}")
-            
-            # Only add to trade list during scheduled hours
-            if should_trade:
-                self.liquidation_set.liquidations.insert(0, long_liquidation)
-        
-        if total_short > MINIMAL_LIQUIDATION and nr_of_liquidations >= MINIMAL_NR_OF_LIQUIDATIONS:
-            short_liquidation = Liquidation(
-                _id=f"s-{datetime.fromtimestamp(candle.timestamp / 1000).strftime('%H%M')}",
-                amount=total_short,
-                direction="short",
-                time=l_time,
-                nr_of_liquidations=nr_of_liquidations,
-                candle=candle,
-                on_liquidation_days=is_trading_day,
-                during_liquidation_hours=is_trading_hour,
+            logger.info(
+                f"🔔 {liquidation.direction.upper()} liquidation: "
+                f"${liquidation.amount:,.0f} {trade_status}"
             )
-            # Always log the detection
-            trade_status = "📊 WILL TRADE" if should_trade else "👀 (outside trading hours)"
-            logger.info(f"🔔 SHORT liquidation: ${total_short:,.0f} {trade_status}")
             
             # Only add to trade list during scheduled hours
             if should_trade:
-                self.liquidation_set.liquidations.insert(0, short_liquidation)
+                self.liquidation_set.liquidations.appendleft(liquidation)
 
 
 # ================================================================
@@ -561,75 +576,90 @@ async def main() -> None:
     print("  📊 PAPER TRADING BOT (Scheduled Mode)")
     print("=" * 70)
     print(f"  • Trading Days: Mon-Fri (0-4)")
-    print(f"  • Trading Hours: {list(LIQUIDATION_HOURS)}")
+    print(f"  • Trading Hours: {sorted(LIQUIDATION_HOURS)}")
     print(f"  • Starting Balance: ${STARTING_BALANCE:,.2f}")
     print("=" * 70 + "\n")
     
+    # Stop on Ctrl+C without polling a flag, also during the startup requests
+    stop = Event()
+    get_running_loop().add_signal_handler(signal.SIGINT, stop.set)
+    
     # === Setup Scheduled Account ===
-    liquidations: List[Liquidation] = []
-    liquidation_set = LiquidationSet(liquidations=liquidations)
+    liquidation_set = LiquidationSet()
     
     scanner = PaperScanner(datetime.now(), liquidation_set, mode="Scheduled")
-    await scanner.set_symbols()
-    
     exchange = PaperExchange(
         liquidation_set, scanner, STARTING_BALANCE, mode="Scheduled"
     )
     scanner.exchange = exchange
     
-    # Set leverage
-    for direction in ["long", "short"]:
-        await exchange.set_leverage(TICKER, LEVERAGE, direction)
-    
-    # Set initial position size
-    await exchange.set_position_sizes()
-    
-    logger.info(f"📡 Scanning {len(scanner.symbols.split(','))} BTC markets")
-    logger.info("✅ Paper trading started")
-    
-    first_run = True
-    
-    while True:
+    try:
+        await scanner.set_symbols()
+        
+        # Load Binance markets once up front (public data only, no rate limiting needed)
+        BINANCE_EXCHANGE.enableRateLimit = False
+        try:
+            await BINANCE_EXCHANGE.load_markets()
+        except Exception as e:
+            logger.error("[%s] Error loading markets: %s", exchange.mode, e)
+        exchange.start_streams()
+        
+        # Leverage is simulated, only applied through the position size
+        logger.info("⚙️ Leverage: %dx long/short", LEVERAGE)
+        
+        # Set initial position size
+        exchange.set_position_sizes()
+        
+        logger.info("📡 Scanning %d BTC markets", len(scanner.symbols.split(",")))
+        logger.info("✅ Paper trading started")
+        
         now = datetime.now()
+        first_run = True
         
-        # Run every 5 minutes (matching original bot)
-        if (now.minute % 5 == 0 and now.second == 0) or first_run:
-            if first_run:
+        while not stop.is_set():
+            # Run every 5 minutes (matching original bot)
+            if now.minute % 5 == 0 or first_run:
                 first_run = False
-            
-            # Update scanner time
-            scanner.now = now
-            
-            # Get last candle
-            last_candle = await exchange.get_last_candle(now)
-            if last_candle:
-                # Run loop
-                await exchange.run_loop(last_candle)
                 
-                # Fetch new liquidations
-                symbols = await scanner.handle_coinalyze_url(COINALYZE_LIQUIDATION_URL)
-                await scanner.handle_liquidation_set(last_candle, symbols)
+                # Update scanner time
+                scanner.now = now
+                
+                # Get last candle and new liquidations concurrently
+                last_candle, symbols = await gather(
+                    exchange.get_last_candle(now),
+                    scanner.handle_coinalyze_url(COINALYZE_LIQUIDATION_URL),
+                )
+                if last_candle:
+                    # Run loop
+                    exchange.run_loop(last_candle)
+                    
+                    # Handle new liquidations
+                    scanner.handle_liquidation_set(last_candle, symbols)
             
-            await sleep(0.99)
-        
-        # Recalculate position sizes (every 5 min at :04)
-        if now.minute % 5 == 4 and now.second == 0:
-            await exchange.set_position_sizes()
-            await sleep(0.99)
-        
-        await sleep(0.01)
+            # Recalculate position sizes (every 5 min at :04)
+            if now.minute % 5 == 4:
+                exchange.set_position_sizes()
+            
+            # Sleep until the start of the next minute instead of polling the clock
+            now = next_minute(datetime.now())
+            if not await sleep_until(now, stop):
+                break
+    finally:
+        await exchange.stop_streams()
+        await BINANCE_EXCHANGE.close()
+        await scanner.close()
+    
+    print_shutdown()
 
 
-def signal_handler(sig, frame):
-    """Handle Ctrl+C gracefully"""
+def print_shutdown() -> None:
+    """Print the shutdown banner after Ctrl+C"""
     print("\n\n" + "=" * 70)
     print("  📊 PAPER TRADING RESULTS")
     print("=" * 70)
     print("  Shutting down...")
     print("=" * 70 + "\n")
-    sys.exit(0)
 
 
 if __name__ == "__main__":
-    signal.signal(signal.SIGINT, signal_handler)
     run(main())